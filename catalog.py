@@ -0,0 +1,97 @@
+"""Query the ibookr book catalog.
+
+Usage:
+    python catalog.py find "bloody chamber"
+    python catalog.py isbn 9781409015369
+    python catalog.py dupes
+    python catalog.py stats
+    python catalog.py rebuild [--full]
+
+The catalog and notes locations default to the catalog_db_path and
+json_book_output_folder environment variables used by main.py.
+"""
+
+import argparse
+import logging
+import os
+import sys
+
+# ibookr.settings is not imported here on purpose: it parses the command line
+# and sets up logging on import, and lookups should stay fast.
+from ibookr.helpers import catalog_helper
+
+
+def _print_books(books: list[dict]):
+    for book in books:
+        print(
+            f"{book['author'] or '?'} - {book['title'] or '?'}"
+            f" [{book['isbn'] or 'no isbn'}] ({book['path']})"
+        )
+
+
+def main(argv: list[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Query the ibookr book catalog.")
+    parser.add_argument(
+        "--db",
+        default=os.environ.get("catalog_db_path") or "temp/catalog.db",
+        help="catalog database path",
+    )
+    parser.add_argument(
+        "--notes",
+        default=os.environ.get("json_book_output_folder") or "temp/json_book_output",
+        help="book notes folder",
+    )
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    find_parser = subparsers.add_parser("find", help="search by title or author")
+    find_parser.add_argument("text")
+    find_parser.add_argument("--limit", type=int, default=20)
+
+    isbn_parser = subparsers.add_parser("isbn", help="look up a book by ISBN")
+    isbn_parser.add_argument("isbn")
+
+    subparsers.add_parser("dupes", help="list books that appear more than once")
+    subparsers.add_parser("stats", help="show catalog statistics")
+
+    rebuild_parser = subparsers.add_parser(
+        "rebuild", help="synchronize the catalog with the notes folder"
+    )
+    rebuild_parser.add_argument(
+        "--full", action="store_true", help="parse every note again"
+    )
+
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        logging.basicConfig(level=logging.INFO, format="%(message)s")
+        try:
+            catalog_helper.rebuild_catalog(args.db, args.notes, full=args.full)
+        except NotADirectoryError as e:
+            print(f"{e} (set --notes or json_book_output_folder)", file=sys.stderr)
+            return 1
+        return 0
+
+    if not os.path.exists(args.db):
+        print(f"Catalog not found: {args.db} (run 'rebuild' first)", file=sys.stderr)
+        return 1
+
+    if args.command == "find":
+        books = catalog_helper.find_books(args.db, args.text, args.limit)
+        _print_books(books)
+        return 0 if books else 1
+    elif args.command == "isbn":
+        books = catalog_helper.find_books_by_isbn(args.db, args.isbn)
+        _print_books(books)
+        return 0 if books else 1
+    elif args.command == "dupes":
+        for group in catalog_helper.find_duplicate_books(args.db):
+            _print_books(group)
+            print()
+    elif args.command == "stats":
+        for key, value in catalog_helper.catalog_stats(args.db).items():
+            print(f"{key}: {value}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,10 @@
 from ibookr.settings import settings
 from .models import ImageToBookResult
+from .profile_helper import profile_stage
 
 
 from pydantic_ai import Agent, BinaryContent
+from pydantic_ai.usage import RunUsage
 from pydantic_ai.models.openrouter import OpenRouterModel
 from pydantic_ai.providers.openrouter import OpenRouterProvider
 
@@ -43,12 +45,20 @@ def extract_book_data_from_image_file(image_file_path: Path) -> list[ImageToBook
 def extract_book_data_from_image(
     image_data: bytes, image_mimetype: str = "image/png"
 ) -> list[ImageToBookResult]:
+    output, _ = extract_book_data_from_image_with_usage(image_data, image_mimetype)
+    return output
+
+
+def extract_book_data_from_image_with_usage(
+    image_data: bytes, image_mimetype: str = "image/png"
+) -> tuple[list[ImageToBookResult], RunUsage]:
     agent = AgentHelper.get_agent()
     binary_content = BinaryContent(data=image_data, media_type=image_mimetype)
-    result = agent.run_sync(
-        [
-            binary_content,
-        ]
-    )
+    with profile_stage("agent.run"):
+        result = agent.run_sync(
+            [
+                binary_content,
+            ]
+        )
     logger.info(f"AI Agent processed image data, Usage: {result.usage()}")
-    return result.output
+    return result.output, result.usage()
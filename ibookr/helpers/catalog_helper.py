@@ -0,0 +1,292 @@
+import json
+import logging
+import os
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# frontmatter keys written by Book.to_markdown_file -> catalog columns
+_SCALAR_FIELDS = {
+    "title": "title",
+    "series": "series",
+    "seriesNo": "series_no",
+    "author": "author",
+    "publisher": "publisher",
+    "firstPublishYear": "first_publish_year",
+    "pageCount": "page_count",
+    "isbn": "isbn",
+    "coverImageUrl": "cover_image_url",
+    "localCoverImageUrl": "local_cover_image_url",
+    "created": "created",
+    "status": "status",
+}
+_LIST_FIELDS = ["categories", "tags", "subjects", "persons", "places", "times"]
+
+_COLUMNS = (
+    ["path", "mtime", "title_key", "author_key"]
+    + list(_SCALAR_FIELDS.values())
+    + _LIST_FIELDS
+)
+
+# below this many changed notes a process pool costs more than it saves
+_PARALLEL_SCAN_THRESHOLD = 64
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS books (
+    path TEXT PRIMARY KEY,
+    mtime REAL NOT NULL,
+    title_key TEXT,
+    author_key TEXT,
+    {", ".join(f"{c} TEXT" for c in _SCALAR_FIELDS.values())},
+    {", ".join(f"{c} TEXT" for c in _LIST_FIELDS)}
+);
+CREATE INDEX IF NOT EXISTS idx_books_title_key ON books (title_key);
+CREATE INDEX IF NOT EXISTS idx_books_author_key ON books (author_key);
+CREATE INDEX IF NOT EXISTS idx_books_isbn ON books (isbn);
+"""
+
+
+def _search_key(text: str) -> str:
+    """Lowercase text and keep only alphanumerics and single spaces."""
+    return " ".join(
+        "".join(c if c.isalnum() else " " for c in (text or "").lower()).split()
+    )
+
+
+def _strip_quotes(value: str) -> str:
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+        return value[1:-1]
+    return value
+
+
+def parse_markdown_note(file_path: Path) -> dict:
+    """Parse the YAML frontmatter of a book note into a flat dict.
+    Only the simple key/value and list layout written by
+    Book.to_markdown_file is supported."""
+
+    result = {}
+    current_list = None
+    with open(file_path, "r", encoding="utf-8") as f:
+        if f.readline().strip() != "---":
+            return result
+        for line in f:
+            stripped = line.strip()
+            if stripped == "---":
+                break
+            if stripped.startswith("- ") and current_list is not None:
+                current_list.append(_strip_quotes(stripped[2:].strip()))
+                continue
+            key, sep, value = line.partition(":")
+            if not sep:
+                continue
+            key = key.strip()
+            value = value.strip()
+            if key in _LIST_FIELDS:
+                current_list = result.setdefault(key, [])
+                if value:
+                    current_list.append(_strip_quotes(value))
+            else:
+                current_list = None
+                result[key] = _strip_quotes(value)
+    return result
+
+
+def _note_to_row(notes_folder: Path, file_path: Path) -> tuple | None:
+    """Build a catalog row from a note file. Returns None if the note
+    cannot be read."""
+
+    try:
+        mtime = file_path.stat().st_mtime
+        note = parse_markdown_note(file_path)
+    except (OSError, UnicodeDecodeError) as e:
+        logger.warning(f"Could not read note {file_path}: {e}")
+        return None
+
+    row = {
+        "path": file_path.relative_to(notes_folder).as_posix(),
+        "mtime": mtime,
+        "title_key": _search_key(note.get("title")),
+        "author_key": _search_key(note.get("author")),
+    }
+    for key, column in _SCALAR_FIELDS.items():
+        row[column] = note.get(key) or None
+    for key in _LIST_FIELDS:
+        row[key] = json.dumps(note.get(key, []), ensure_ascii=False)
+    return tuple(row[c] for c in _COLUMNS)
+
+
+def _notes_to_rows(notes_folder: Path, file_paths: list[Path]) -> list[tuple]:
+    return [
+        row
+        for row in (_note_to_row(notes_folder, p) for p in file_paths)
+        if row is not None
+    ]
+
+
+def _notes_to_rows_parallel(notes_folder: Path, file_paths: list[Path]) -> list[tuple]:
+    if len(file_paths) < _PARALLEL_SCAN_THRESHOLD:
+        return _notes_to_rows(notes_folder, file_paths)
+
+    workers = os.cpu_count() or 1
+    chunk_size = max(1, len(file_paths) // (workers * 4))
+    chunks = [
+        file_paths[i : i + chunk_size] for i in range(0, len(file_paths), chunk_size)
+    ]
+    rows = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_rows in executor.map(
+            _notes_to_rows, [notes_folder] * len(chunks), chunks
+        ):
+            rows.extend(chunk_rows)
+    return rows
+
+
+def open_catalog(catalog_db_path: str) -> sqlite3.Connection:
+    """Open (and create if needed) the catalog database."""
+
+    Path(catalog_db_path).parent.mkdir(parents=True, exist_ok=True)
+    connection = sqlite3.connect(catalog_db_path)
+    connection.row_factory = sqlite3.Row
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(_SCHEMA)
+    return connection
+
+
+def _upsert_rows(connection: sqlite3.Connection, rows: list[tuple]):
+    placeholders = ", ".join("?" for _ in _COLUMNS)
+    connection.executemany(
+        f"INSERT OR REPLACE INTO books ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+        rows,
+    )
+
+
+def update_catalog(
+    catalog_db_path: str, notes_folder_path: str, note_file_paths: list[str]
+) -> int:
+    """Add or refresh the given note files in the catalog.
+    Returns the number of catalog rows written."""
+
+    notes_folder = Path(notes_folder_path).resolve()
+    rows = _notes_to_rows(notes_folder, [Path(p).resolve() for p in note_file_paths])
+    with open_catalog(catalog_db_path) as connection:
+        _upsert_rows(connection, rows)
+    connection.close()
+    logger.info(f"Catalog updated with {len(rows)} notes.")
+    return len(rows)
+
+
+def rebuild_catalog(
+    catalog_db_path: str, notes_folder_path: str, full: bool = False
+) -> int:
+    """Synchronize the catalog with the notes folder.
+    Only notes whose modification time changed are parsed again, unless
+    full is set. Rows of deleted notes are removed.
+    Returns the number of notes parsed.
+    Raises NotADirectoryError if the notes folder does not exist, rather
+    than treating every cataloged note as deleted."""
+
+    notes_folder = Path(notes_folder_path).resolve()
+    if not notes_folder.is_dir():
+        raise NotADirectoryError(f"Notes folder not found: {notes_folder_path}")
+    note_files = {
+        p.relative_to(notes_folder).as_posix(): p for p in notes_folder.rglob("*.md")
+    }
+
+    with open_catalog(catalog_db_path) as connection:
+        if full:
+            connection.execute("DELETE FROM books")
+            known = {}
+        else:
+            known = dict(connection.execute("SELECT path, mtime FROM books"))
+
+        deleted = [(path,) for path in known if path not in note_files]
+        connection.executemany("DELETE FROM books WHERE path = ?", deleted)
+
+        changed = [
+            file_path
+            for path, file_path in note_files.items()
+            if known.get(path) != file_path.stat().st_mtime
+        ]
+        _upsert_rows(connection, _notes_to_rows_parallel(notes_folder, changed))
+    connection.close()
+
+    logger.info(
+        f"Catalog rebuilt from {notes_folder_path}: {len(changed)} notes parsed, "
+        f"{len(deleted)} removed, {len(note_files)} total."
+    )
+    return len(changed)
+
+
+def find_books(catalog_db_path: str, text: str, limit: int = 20) -> list[dict]:
+    """Find books whose title or author contains the given text."""
+
+    key = f"%{_search_key(text)}%"
+    with open_catalog(catalog_db_path) as connection:
+        rows = connection.execute(
+            "SELECT * FROM books WHERE title_key LIKE ? OR author_key LIKE ? "
+            "ORDER BY author_key, title_key LIMIT ?",
+            (key, key, limit),
+        ).fetchall()
+    connection.close()
+    return [dict(row) for row in rows]
+
+
+def find_books_by_isbn(catalog_db_path: str, isbn: str) -> list[dict]:
+    isbn = "".join(c for c in isbn if c.isalnum())
+    with open_catalog(catalog_db_path) as connection:
+        rows = connection.execute(
+            "SELECT * FROM books WHERE isbn = ?", (isbn,)
+        ).fetchall()
+    connection.close()
+    return [dict(row) for row in rows]
+
+
+def find_duplicate_books(catalog_db_path: str) -> list[list[dict]]:
+    """Group books that share the same author and title (ignoring case and
+    punctuation) or the same ISBN."""
+
+    with open_catalog(catalog_db_path) as connection:
+        rows = connection.execute(
+            "SELECT * FROM books WHERE (author_key, title_key) IN ("
+            "  SELECT author_key, title_key FROM books"
+            "  GROUP BY author_key, title_key HAVING COUNT(*) > 1) "
+            "OR isbn IN ("
+            "  SELECT isbn FROM books WHERE isbn IS NOT NULL"
+            "  GROUP BY isbn HAVING COUNT(*) > 1) "
+            "ORDER BY author_key, title_key"
+        ).fetchall()
+    connection.close()
+
+    groups = {}
+    for row in rows:
+        groups.setdefault(("names", row["author_key"], row["title_key"]), []).append(
+            dict(row)
+        )
+        if row["isbn"]:
+            groups.setdefault(("isbn", row["isbn"]), []).append(dict(row))
+
+    result = []
+    seen = set()
+    for group in groups.values():
+        paths = frozenset(book["path"] for book in group)
+        if len(paths) > 1 and paths not in seen:
+            seen.add(paths)
+            result.append(group)
+    return result
+
+
+def catalog_stats(catalog_db_path: str) -> dict:
+    with open_catalog(catalog_db_path) as connection:
+        stats = dict(
+            connection.execute(
+                "SELECT COUNT(*) AS books, "
+                "COUNT(DISTINCT author_key) AS authors, "
+                "COUNT(isbn) AS with_isbn, "
+                "COUNT(cover_image_url) AS with_cover "
+                "FROM books"
+            ).fetchone()
+        )
+    connection.close()
+    return stats
@@ -0,0 +1,284 @@
+import logging
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+from .models import Book
+
+logger = logging.getLogger(__name__)
+
+# letters that do not decompose into a base letter and a combining mark
+_LETTER_FOLDS = str.maketrans(
+    {"ø": "o", "ł": "l", "đ": "d", "ı": "i", "æ": "ae", "œ": "oe", "þ": "th"}
+)
+_TITLE_ARTICLES = {"the", "a", "an"}
+_AUTHOR_SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+# words that belong to the surname, as in "Ursula K. Le Guin"
+_SURNAME_PARTICLES = {
+    "le", "la", "de", "del", "della", "der", "den", "di", "da", "du", "dos",
+    "van", "von", "ter", "ten", "st", "saint", "mac", "ibn", "bin", "al", "el",
+}  # fmt: skip
+
+_NUMBER_WORDS = {
+    word: str(value)
+    for value, words in enumerate(
+        [
+            ("zero",),
+            ("one", "first"),
+            ("two", "second"),
+            ("three", "third"),
+            ("four", "fourth"),
+            ("five", "fifth"),
+            ("six", "sixth"),
+            ("seven", "seventh"),
+            ("eight", "eighth"),
+            ("nine", "ninth"),
+            ("ten", "tenth"),
+            ("eleven", "eleventh"),
+            ("twelve", "twelfth"),
+            ("thirteen", "thirteenth"),
+            ("fourteen", "fourteenth"),
+            ("fifteen", "fifteenth"),
+            ("sixteen", "sixteenth"),
+            ("seventeen", "seventeenth"),
+            ("eighteen", "eighteenth"),
+            ("nineteen", "nineteenth"),
+        ]
+    )
+    for word in words
+}
+_NUMBER_WORDS.update(
+    {
+        word: str(value)
+        for value, words in [
+            (20, ("twenty", "twentieth")),
+            (30, ("thirty", "thirtieth")),
+            (40, ("forty", "fortieth")),
+            (50, ("fifty", "fiftieth")),
+            (60, ("sixty", "sixtieth")),
+            (70, ("seventy", "seventieth")),
+            (80, ("eighty", "eightieth")),
+            (90, ("ninety", "ninetieth")),
+            (100, ("hundred", "hundredth")),
+            (1000, ("thousand", "thousandth")),
+        ]
+        for word in words
+    }
+)
+_ROMAN_VALUES = {"i": 1, "v": 5, "x": 10, "l": 50, "c": 100, "d": 500, "m": 1000}
+_ROMAN_NUMERAL = re.compile(r"^m{0,3}(cm|cd|d?c{0,3})(xc|xl|l?x{0,3})(ix|iv|v?i{0,3})$")
+_ROMAN_LETTERS = re.compile(r"^[ivxlcdm]+$")
+
+# shorter titles are only matched exactly, a single typo is too large a change
+_MIN_FUZZY_TITLE_LENGTH = 10
+
+
+def normalize_text(text: str) -> str:
+    """Fold case, accents and punctuation so that spelling variants compare equal."""
+
+    text = unicodedata.normalize("NFKD", text or "").casefold().translate(_LETTER_FOLDS)
+    text = "".join(
+        c if c.isalnum() else " " for c in text if not unicodedata.combining(c)
+    )
+    return " ".join(text.split())
+
+
+def _roman_to_int(word: str) -> int:
+    total = 0
+    for current, following in zip(word, word[1:] + " "):
+        value = _ROMAN_VALUES[current]
+        total += -value if _ROMAN_VALUES.get(following, 0) > value else value
+    return total
+
+
+def normalize_number(word: str) -> str:
+    """Write digits, roman numerals and number words the same way,
+    "1", "01", "i", "one" and "first" all become "1"."""
+
+    if word.isdigit():
+        return str(int(word))
+    if word in _NUMBER_WORDS:
+        return _NUMBER_WORDS[word]
+    if _ROMAN_NUMERAL.match(word):
+        return str(_roman_to_int(word))
+    return word
+
+
+def normalize_title(title: str) -> str:
+    words = normalize_text(title).split()
+    if len(words) > 1 and words[0] in _TITLE_ARTICLES:
+        words = words[1:]
+    return " ".join(normalize_number(w) for w in words)
+
+
+def _is_volume_marker(word: str) -> bool:
+    # "Book 2", "Part V", "Volume Twenty", "Book B" all name a distinct volume
+    return (
+        word.isdigit()
+        or len(word) == 1
+        or word in _NUMBER_WORDS
+        or bool(_ROMAN_LETTERS.match(word))
+    )
+
+
+def _differing_words(a: str, b: str) -> list[str]:
+    a_words, b_words = a.split(), b.split()
+    differing = []
+    for tag, a_start, a_end, b_start, b_end in SequenceMatcher(
+        None, a_words, b_words, autojunk=False
+    ).get_opcodes():
+        if tag != "equal":
+            differing.extend(a_words[a_start:a_end])
+            differing.extend(b_words[b_start:b_end])
+    return differing
+
+
+def display_author(author: str) -> str:
+    """Return an author name in "First Last" order, "Carter, Angela" becomes
+    "Angela Carter"."""
+
+    author = (author or "").strip()
+    if "," in author:
+        last, _, first = author.partition(",")
+        author = f"{first.strip()} {last.strip()}"
+    return author.strip()
+
+
+def _split_author(author: str) -> tuple[list[str], str]:
+    """Split a normalized author name into (first names, surname), keeping
+    particles with the surname: "Ursula K. Le Guin" -> (["ursula", "k"], "le guin")."""
+
+    words = [
+        w
+        for w in normalize_text(display_author(author)).split()
+        if w not in _AUTHOR_SUFFIXES
+    ]
+    if not words:
+        return ([], "")
+    surname_start = len(words) - 1
+    while surname_start > 0 and words[surname_start - 1] in _SURNAME_PARTICLES:
+        surname_start -= 1
+    return (words[:surname_start], " ".join(words[surname_start:]))
+
+
+def author_surname(author: str) -> str:
+    """Return the normalized surname of an author, "Carter, Angela",
+    "A. Carter" and "ANGELA CARTER" all give "carter"."""
+
+    return _split_author(author)[1]
+
+
+def _first_names_subsequence(short: list[str], long: list[str], matches) -> bool:
+    # every first name of short must match a later first name of long, in order
+    remaining = iter(long)
+    return all(any(matches(s, l) for l in remaining) for s in short)
+
+
+def _name_or_initial(a: str, b: str) -> bool:
+    return a == b or (len(a) == 1 and b.startswith(a))
+
+
+def _authors_match(a: str, b: str) -> bool:
+    """Whether two spellings can name the same author. First names may be
+    missing or abbreviated on a spine, "Ursula Le Guin" matches "U. K. Le Guin"."""
+
+    a_first, a_surname = _split_author(a)
+    b_first, b_surname = _split_author(b)
+    if a_surname != b_surname:
+        return False
+    if len(a_first) > len(b_first):
+        a_first, b_first = b_first, a_first
+    return _first_names_subsequence(
+        a_first, b_first, lambda s, l: _name_or_initial(s, l) or _name_or_initial(l, s)
+    )
+
+
+def _extends_author(old: str, new: str) -> bool:
+    """Whether new is a more complete spelling of old, e.g. "Angela Carter"
+    of "A. Carter"."""
+
+    old_first, old_surname = _split_author(old)
+    new_first, new_surname = _split_author(new)
+    return (
+        bool(new_surname)
+        and old_surname == new_surname
+        # every first name of old must be kept or spelled out in new
+        and _first_names_subsequence(old_first, new_first, _name_or_initial)
+        and len(" ".join(new_first)) > len(" ".join(old_first))
+    )
+
+
+def is_blank_book(book: Book) -> bool:
+    """A book without a usable title cannot be looked up and is dropped."""
+    return not normalize_title(book.title)
+
+
+class BookDeduplicator:
+    """Drop blank and duplicate books before they are enriched.
+    Use one instance for a whole run and call mark_processed once a file's
+    books are written, so later files of the run skip them as well."""
+
+    def __init__(self, title_similarity: float = 0.9):
+        self.title_similarity = title_similarity
+        # author surname -> [(normalized title, kept book)]
+        self._seen: dict[str, list[tuple[str, Book]]] = {}
+
+    def _titles_match(self, a: str, b: str) -> bool:
+        if a == b:
+            return True
+        if min(len(a), len(b)) < _MIN_FUZZY_TITLE_LENGTH:
+            return False
+        if any(_is_volume_marker(w) for w in _differing_words(a, b)):
+            return False
+        return SequenceMatcher(None, a, b).ratio() >= self.title_similarity
+
+    def _find_duplicate(self, book: Book, title_key: str, *seen_groups):
+        surname = author_surname(book.author)
+        for seen in seen_groups:
+            for seen_title_key, seen_book in seen.get(surname, []):
+                if _authors_match(book.author, seen_book.author) and self._titles_match(
+                    title_key, seen_title_key
+                ):
+                    return seen_book
+        return None
+
+    def deduplicate(self, books: list[Book]) -> list[Book]:
+        """Return the books that are not blank, not repeated in the list and
+        not already marked as processed."""
+
+        result = []
+        kept: dict[str, list[tuple[str, Book]]] = {}
+        for book in books:
+            title_key = normalize_title(book.title)
+            if is_blank_book(book):
+                logger.info(f"Dropping book without title: {book.author}")
+                continue
+            book.title = book.title.strip()
+            # later stages expect an author string, even an illegible one
+            book.author = display_author(book.author)
+
+            duplicate = self._find_duplicate(book, title_key, self._seen, kept)
+            if duplicate is not None:
+                logger.info(
+                    f"Dropping duplicate book {book.author} - {book.title} "
+                    f"(same as {duplicate.author} - {duplicate.title})"
+                )
+                # keep the most complete author name, e.g. "Angela Carter" over "A. Carter"
+                if _extends_author(duplicate.author, book.author):
+                    duplicate.author = book.author
+                continue
+
+            kept.setdefault(author_surname(book.author), []).append((title_key, book))
+            result.append(book)
+
+        if len(result) < len(books):
+            logger.info(f"Deduplicated books: kept {len(result)} out of {len(books)}.")
+        return result
+
+    def mark_processed(self, books: list[Book]):
+        """Remember books that were written, later calls to deduplicate drop them."""
+
+        for book in books:
+            self._seen.setdefault(author_surname(book.author), []).append(
+                (normalize_title(book.title), book)
+            )
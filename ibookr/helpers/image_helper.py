@@ -1,11 +1,25 @@
-from PIL import Image
+from PIL import Image, ImageChops
 from pathlib import Path
 from heic2png import HEIC2PNG
 
+from .models import ImageEncodingInfo
+from .profile_helper import profile_stage
+
+import io
+import math
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Gemini bills images in 768x768 tiles of 258 tokens each,
+# images with both sides up to 384px count as a single tile
+_IMAGE_TILE_SIZE = 768
+_IMAGE_SMALL_SIZE = 384
+_IMAGE_TOKENS_PER_TILE = 258
+
+_JPEG_QUALITY_STEPS = [90, 85, 80, 75, 70, 60]
+_MIN_ENCODE_WIDTH = 384
+
 
 def _convert_heic_files_to_png(input_folder: Path, output_folder: Path):
     """Convert all HEIC files in the input folder to PNG format.
@@ -18,9 +32,10 @@ def _convert_heic_files_to_png(input_folder: Path, output_folder: Path):
 
     for heic_file in input_files:
         logger.info(f"Processing image: {heic_file.name}")
-        heic_img = HEIC2PNG(heic_file, quality=90)
-        output_file_path = output_folder / (heic_file.stem + ".png")
-        heic_img.save(output_file_path, ".png")
+        with profile_stage("image.heic_to_png"):
+            heic_img = HEIC2PNG(heic_file, quality=90)
+            output_file_path = output_folder / (heic_file.stem + ".png")
+            heic_img.save(output_file_path, ".png")
         logger.info(
             f"Converted HEIC to PNG: {heic_file.name} -> {output_file_path.name}"
         )
@@ -40,7 +55,7 @@ def _convert_jpeg_files_to_png(input_folder: Path, output_folder: Path):
 
     for jpeg_file in input_files:
         logger.info(f"Processing image: {jpeg_file.name}")
-        with Image.open(jpeg_file) as img:
+        with profile_stage("image.jpeg_to_png"), Image.open(jpeg_file) as img:
             output_file_path = output_folder / (jpeg_file.stem + ".png")
             img.save(output_file_path, "PNG")
             logger.info(
@@ -67,7 +82,7 @@ def _resize_and_move_png_images(
 
         output_file_path = output_folder / png_file.name
         resized = False
-        with Image.open(png_file) as img:
+        with profile_stage("image.resize"), Image.open(png_file) as img:
             if resize_width > 0 and img.width > resize_width:
                 # Resize image while maintaining aspect ratio
                 img = img.resize(
@@ -120,3 +135,136 @@ def batch_process_input_images(
         logger.error(f"Error processing input images: {e}")
 
     logger.info("Input image processing completed.")
+
+
+def estimate_image_tokens(width: int, height: int) -> int:
+    """Estimate the input tokens an image of the given size costs."""
+
+    if width <= _IMAGE_SMALL_SIZE and height <= _IMAGE_SMALL_SIZE:
+        return _IMAGE_TOKENS_PER_TILE
+    tiles = math.ceil(width / _IMAGE_TILE_SIZE) * math.ceil(height / _IMAGE_TILE_SIZE)
+    return tiles * _IMAGE_TOKENS_PER_TILE
+
+
+def _find_content_box(
+    img: Image.Image, threshold: int = 32, padding_ratio: float = 0.02
+) -> tuple[int, int, int, int] | None:
+    """Find the bounding box of the image content, ignoring uniform margins
+    of the top-left corner colour. Returns None if there is nothing worth
+    cropping."""
+
+    # work on a small copy, it is faster and smooths out sensor noise
+    sample = img.convert("RGB")
+    sample.thumbnail((512, 512))
+    background = Image.new("RGB", sample.size, sample.getpixel((0, 0)))
+    mask = (
+        ImageChops.difference(sample, background)
+        .convert("L")
+        .point(lambda v: 255 if v > threshold else 0)
+    )
+    box = mask.getbbox()
+    if box is None:
+        return None
+
+    scale_x = img.width / sample.width
+    scale_y = img.height / sample.height
+    pad_x = int(img.width * padding_ratio)
+    pad_y = int(img.height * padding_ratio)
+    left = max(0, int(box[0] * scale_x) - pad_x)
+    top = max(0, int(box[1] * scale_y) - pad_y)
+    right = min(img.width, math.ceil(box[2] * scale_x) + pad_x)
+    bottom = min(img.height, math.ceil(box[3] * scale_y) + pad_y)
+
+    # not worth it for less than 5% of the image area
+    if (right - left) * (bottom - top) > 0.95 * img.width * img.height:
+        return None
+    return (left, top, right, bottom)
+
+
+def encode_image_for_extraction(
+    image_file_path: Path,
+    token_budget: int,
+    byte_budget: int = 0,
+    crop_margins: bool = True,
+) -> tuple[bytes, ImageEncodingInfo]:
+    """Encode an image for the extraction request.
+    Uniform margins are cropped, the image is downscaled until its estimated
+    token count fits the token budget and JPEG quality is lowered (then the
+    image downscaled further) until it fits the byte budget.
+    A token budget of 0 disables adaptive encoding and returns the file as is."""
+
+    with Image.open(image_file_path) as img:
+        info = ImageEncodingInfo(
+            image_name=image_file_path.name,
+            original_width=img.width,
+            original_height=img.height,
+        )
+
+        if token_budget <= 0:
+            data = image_file_path.read_bytes()
+            info.width, info.height = img.size
+            info.mimetype = "image/png"
+            info.byte_size = len(data)
+            info.estimated_tokens = estimate_image_tokens(img.width, img.height)
+            return data, info
+
+        img = img.convert("RGB")
+
+    if crop_margins:
+        crop_box = _find_content_box(img)
+        if crop_box:
+            img = img.crop(crop_box)
+            info.crop_box = crop_box
+
+    width, height = img.size
+    while (
+        estimate_image_tokens(width, height) > token_budget
+        and width > _MIN_ENCODE_WIDTH
+    ):
+        width, height = int(width * 0.9), int(height * 0.9)
+
+    while True:
+        resized = img
+        if (width, height) != img.size:
+            resized = img.resize((width, height), Image.LANCZOS)
+
+        for quality in _JPEG_QUALITY_STEPS:
+            buffer = io.BytesIO()
+            resized.save(buffer, "JPEG", quality=quality, optimize=True)
+            if byte_budget <= 0 or buffer.tell() <= byte_budget:
+                break
+
+        if byte_budget <= 0 or buffer.tell() <= byte_budget:
+            break
+        if width <= _MIN_ENCODE_WIDTH:
+            logger.warning(
+                f"Could not fit {image_file_path.name} into {byte_budget} bytes, "
+                f"sending {buffer.tell()} bytes."
+            )
+            break
+        width, height = int(width * 0.85), int(height * 0.85)
+
+    data = buffer.getvalue()
+    info.width, info.height = width, height
+    info.mimetype = "image/jpeg"
+    info.quality = quality
+    info.byte_size = len(data)
+    info.estimated_tokens = estimate_image_tokens(width, height)
+    logger.info(
+        f"Encoded image {image_file_path.name}: "
+        f"{info.original_width}x{info.original_height} -> {width}x{height}, "
+        f"quality {quality}, {len(data)} bytes, ~{info.estimated_tokens} tokens"
+    )
+    return data, info
+
+
+def record_image_encoding_info(usage_log_path: str, info: ImageEncodingInfo):
+    """Append the encoding and usage info of an image to a JSON lines file,
+    to tune the encoding budgets from real runs."""
+
+    try:
+        Path(usage_log_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(usage_log_path, "a", encoding="utf-8") as f:
+            f.write(info.model_dump_json() + "\n")
+    except OSError as e:
+        logger.warning(f"Could not record image usage to {usage_log_path}: {e}")
@@ -8,7 +8,11 @@ logger = logging.getLogger(__name__)
 
 
 def _parse_json_input(json_data: list) -> List[Book]:
-    return [Book(**item) for item in json_data]
+    # the model returns null for illegible fields, fall back to the defaults
+    return [
+        Book(**{key: value for key, value in item.items() if value is not None})
+        for item in json_data
+    ]
 
 
 def process_json_input(file_path: str) -> List[Book]:
@@ -8,6 +8,24 @@ class ImageToBookResult(BaseModel):
     author: str = None
 
 
+class ImageEncodingInfo(BaseModel):
+    """How an image was encoded for the extraction request, and what it cost."""
+
+    image_name: str = None
+    original_width: int = None
+    original_height: int = None
+    crop_box: tuple[int, int, int, int] = None
+    width: int = None
+    height: int = None
+    mimetype: str = None
+    quality: int = None
+    byte_size: int = None
+    estimated_tokens: int = None
+    input_tokens: int = None
+    output_tokens: int = None
+    book_count: int = None
+
+
 class Book(BaseModel):
     title: str = None
     series: str = None
@@ -26,7 +44,7 @@ class Book(BaseModel):
     cover_image_url: str = None
     local_cover_image_url: str = None
 
-    def to_markdown_file(self, output_folder_path: str):
+    def to_markdown_file(self, output_folder_path: str) -> str:
         now_formatted = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
         author_name_escaped = (
@@ -98,3 +116,5 @@ class Book(BaseModel):
             f.write("status: AUTOGEN\n")
             f.write("---\n\n")
             f.write(f"# {self.title or ''}\n\n")
+
+        return file_path
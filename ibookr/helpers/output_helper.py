@@ -1,12 +1,25 @@
 import logging
 
 from .models import Book
-
+from .catalog_helper import update_catalog
+from .profile_helper import profile_stage
 
 logger = logging.getLogger(__name__)
 
 
-def output_to_markdown(books: list[Book], output_folder_path: str) -> bool:
-    for book in books:
-        book.to_markdown_file(output_folder_path)
+def output_to_markdown(
+    books: list[Book], output_folder_path: str, catalog_db_path: str = ""
+) -> bool:
+    note_file_paths = []
+    with profile_stage("output.markdown"):
+        for book in books:
+            note_file_paths.append(book.to_markdown_file(output_folder_path))
+
+    if catalog_db_path:
+        # catalog is a derived index, a failure here must not fail the output
+        try:
+            with profile_stage("output.catalog"):
+                update_catalog(catalog_db_path, output_folder_path, note_file_paths)
+        except Exception as e:
+            logger.error(f"Error updating catalog {catalog_db_path}: {e}")
     return True
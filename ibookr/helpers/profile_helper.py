@@ -0,0 +1,138 @@
+import cProfile
+import datetime
+import io
+import json
+import logging
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# stage name -> {"calls", "seconds", "allocated_bytes"}, set while profiling
+_stages: dict[str, dict] | None = None
+
+
+@contextmanager
+def profile_stage(name: str):
+    """Label a section of the pipeline in the profile.
+    Does nothing unless a profile_run is active."""
+
+    if _stages is None:
+        yield
+        return
+
+    start_time = time.perf_counter()
+    start_memory = tracemalloc.get_traced_memory()[0]
+    try:
+        yield
+    finally:
+        stage = _stages.setdefault(
+            name, {"calls": 0, "seconds": 0.0, "allocated_bytes": 0}
+        )
+        stage["calls"] += 1
+        stage["seconds"] += time.perf_counter() - start_time
+        stage["allocated_bytes"] += tracemalloc.get_traced_memory()[0] - start_memory
+
+
+def _write_artifacts(
+    output_folder: Path,
+    run_name: str,
+    profiler: cProfile.Profile,
+    snapshot: tracemalloc.Snapshot,
+    stages: dict[str, dict],
+    total_seconds: float,
+    top_n: int,
+):
+    output_folder.mkdir(parents=True, exist_ok=True)
+
+    profiler.dump_stats(output_folder / f"{run_name}.prof")
+    snapshot.dump(str(output_folder / f"{run_name}.tracemalloc"))
+    with open(output_folder / f"{run_name}_stages.json", "w", encoding="utf-8") as f:
+        json.dump(
+            {"total_seconds": total_seconds, "stages": stages},
+            f,
+            ensure_ascii=False,
+            indent=4,
+        )
+
+    hotspots = io.StringIO()
+    pstats.Stats(profiler, stream=hotspots).sort_stats("tottime").print_stats(top_n)
+    with open(output_folder / f"{run_name}_hotspots.txt", "w", encoding="utf-8") as f:
+        f.write(hotspots.getvalue())
+
+    allocations = snapshot.filter_traces(
+        [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+        ]
+    ).statistics("lineno")
+    with open(
+        output_folder / f"{run_name}_allocations.txt", "w", encoding="utf-8"
+    ) as f:
+        for stat in allocations:
+            f.write(f"{stat}\n")
+
+    return hotspots.getvalue(), allocations[:top_n]
+
+
+@contextmanager
+def profile_run(output_folder_path: str, top_n: int = 20):
+    """Profile everything run inside the block with cProfile and tracemalloc.
+    Writes the cProfile stats, a tracemalloc snapshot, the stage timings and
+    text summaries to the output folder, and logs the top hotspots,
+    allocations and stages."""
+
+    global _stages
+
+    run_name = f"profile_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    _stages = {}
+    started_tracemalloc = not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start(10)
+    profiler = cProfile.Profile()
+    start_time = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        total_seconds = time.perf_counter() - start_time
+        snapshot = tracemalloc.take_snapshot()
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        if started_tracemalloc:
+            tracemalloc.stop()
+        stages, _stages = _stages, None
+
+        try:
+            hotspots, allocations = _write_artifacts(
+                Path(output_folder_path),
+                run_name,
+                profiler,
+                snapshot,
+                stages,
+                total_seconds,
+                top_n,
+            )
+        except OSError as e:
+            logger.error(f"Error writing profile artifacts: {e}")
+        else:
+            logger.info(
+                f"Profile {run_name}: {total_seconds:.2f}s total, "
+                f"peak traced memory {peak_memory / 1024 / 1024:.1f} MiB, "
+                f"artifacts written to {output_folder_path}"
+            )
+            for name, stage in sorted(
+                stages.items(), key=lambda item: item[1]["seconds"], reverse=True
+            ):
+                logger.info(
+                    f"Stage {name}: {stage['seconds']:.2f}s in {stage['calls']} calls, "
+                    f"{stage['allocated_bytes'] / 1024:+.0f} KiB"
+                )
+            logger.info(f"Top {top_n} CPU hotspots:\n{hotspots}")
+            logger.info(
+                f"Top {top_n} allocations:\n"
+                + "\n".join(str(stat) for stat in allocations)
+            )
@@ -4,6 +4,7 @@ import requests
 import logging
 
 from .models import Book
+from .profile_helper import profile_stage
 from ibookr.settings import settings
 
 logger = logging.getLogger(__name__)
@@ -20,7 +21,8 @@ def fill_info_from_openlibrary(book: Book) -> bool:
         "User-Agent": f"{settings.app_name}/{settings.app_version} ({settings.app_contact_email})"
     }
     try:
-        response = requests.get(search_url, params=params, headers=headers)
+        with profile_stage("search.openlibrary"):
+            response = requests.get(search_url, params=params, headers=headers)
         response.raise_for_status()
 
         data = response.json()
@@ -55,7 +57,8 @@ def fill_info_from_googlebooks(
         "User-Agent": f"{settings.app_name}/{settings.app_version} ({settings.app_contact_email})"
     }
     try:
-        response = requests.get(search_url, params=params, headers=headers)
+        with profile_stage("search.googlebooks"):
+            response = requests.get(search_url, params=params, headers=headers)
         response.raise_for_status()
 
         data = response.json()
@@ -138,9 +141,10 @@ def batch_fill(book_inputs: list[Book]) -> int:
         for book_input in book_inputs:
             if fill_book_info(book_input):
                 filled_count += 1
-            time.sleep(
-                settings.book_search_rate_limit_seconds
-            )  # To respect API rate limits
+            with profile_stage("search.rate_limit_sleep"):
+                time.sleep(
+                    settings.book_search_rate_limit_seconds
+                )  # To respect API rate limits
     except Exception as e:
         logger.error(f"Error during batch filling process: {e}")
         return 0
@@ -1,4 +1,4 @@
-from pydantic_settings import BaseSettings, SettingsConfigDict
+from pydantic_settings import BaseSettings, CliImplicitFlag, SettingsConfigDict
 import os
 import logging
 
@@ -44,10 +44,19 @@ class Settings(BaseSettings):
     # API rate limit settings (sleep time between requests)
     book_search_rate_limit_seconds: int = 2
 
+    # minimum similarity (0-1) of normalized titles by the same author
+    # for extracted books to be considered duplicates
+    book_dedupe_title_similarity: float = 0.9
+
     log_file_path: str = ""
 
     debug: bool = False
 
+    # profile each run with cProfile and tracemalloc (python main.py --profile)
+    profile: CliImplicitFlag[bool] = False
+    profile_output_folder: str = "temp/profile"
+    profile_top_n: int = 20
+
     image_to_json_input_folder: str = "temp/image_input"
     image_to_json_preprocessed_folder: str = "temp/image_preprocessed"
     image_to_json_output_folder: str = "temp/json_input"
@@ -55,11 +64,24 @@ class Settings(BaseSettings):
     image_to_json_resize_width: int = 1600
     image_to_json_archive_folder: str = "temp/image_archive"
 
+    # Adaptive encoding of the image sent to the model: margins are cropped and
+    # resolution/JPEG quality are lowered to fit the budgets.
+    # A token budget of 0 sends the preprocessed PNG as is.
+    image_to_json_token_budget: int = 1548
+    image_to_json_byte_budget: int = 1500000
+    image_to_json_crop_margins: bool = True
+    # JSON lines file with encoding and token usage of each image, leave empty to disable
+    image_to_json_usage_log_path: str = "temp/image_usage.jsonl"
+
     json_input_folder: str = "temp/json_input"
     json_output_folder: str = "temp/json_output"
     json_book_output_folder: str = "temp/json_book_output"
     json_error_folder: str = "temp/json_error"
 
+    # SQLite catalog of all book notes written to json_book_output_folder
+    # leave empty to disable
+    catalog_db_path: str = "temp/catalog.db"
+
     # openrouter_model_name: str = "nvidia/nemotron-nano-12b-v2-vl:free"
     openrouter_model_name: str = "google/gemini-2.5-flash"
     openrouter_api_key: str = ""
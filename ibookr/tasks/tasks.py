@@ -1,8 +1,15 @@
-from ibookr.helpers.image_helper import batch_process_input_images
-from ibookr.helpers.agent_helper import extract_book_data_from_image_file
+from ibookr.helpers.image_helper import (
+    batch_process_input_images,
+    encode_image_for_extraction,
+    record_image_encoding_info,
+)
+from ibookr.helpers.agent_helper import extract_book_data_from_image_with_usage
 from ibookr.helpers.input_helper import process_json_input
+from ibookr.helpers.dedupe_helper import BookDeduplicator, is_blank_book
 from ibookr.helpers.search_helper import batch_fill
 from ibookr.helpers.output_helper import output_to_markdown
+from ibookr.helpers.catalog_helper import rebuild_catalog
+from ibookr.helpers.profile_helper import profile_run, profile_stage
 
 from ibookr.settings import settings
 
@@ -26,6 +33,10 @@ def image_to_json_task(
     json_output_folder_path: str,
     image_error_folder_path: str,
     resize_width: int = 800,
+    token_budget: int = 0,
+    byte_budget: int = 0,
+    crop_margins: bool = True,
+    usage_log_path: str = "",
 ):
     """Process images in the input folder to extract book data and save as JSON files in the output folder."""
     try:
@@ -46,7 +57,21 @@ def image_to_json_task(
 
             try:
                 # Extract book data using the agent
-                book_data_results = extract_book_data_from_image_file(png_file)
+                with profile_stage("image.encode"):
+                    image_data, encoding_info = encode_image_for_extraction(
+                        png_file,
+                        token_budget=token_budget,
+                        byte_budget=byte_budget,
+                        crop_margins=crop_margins,
+                    )
+                book_data_results, usage = extract_book_data_from_image_with_usage(
+                    image_data, encoding_info.mimetype
+                )
+                if usage_log_path:
+                    encoding_info.input_tokens = usage.input_tokens
+                    encoding_info.output_tokens = usage.output_tokens
+                    encoding_info.book_count = len(book_data_results)
+                    record_image_encoding_info(usage_log_path, encoding_info)
 
                 # Save extracted data to JSON file
                 output_folder = Path(json_output_folder_path)
@@ -74,14 +99,19 @@ def image_to_json_task(
         logger.error(f"Error in image to JSON task: {e}")
 
 
-def process_single_json_file_task(
+def process_json_files_task(
     json_input_folder: str,
     json_output_folder: str,
     json_book_output_folder: str,
     json_error_folder: str,
+    catalog_db_path: str = "",
+    dedupe_title_similarity: float = 0.9,
 ):
     logger.info("Starting processing of input files.")
 
+    # shared by all files so books written earlier in this run are dropped too
+    deduplicator = BookDeduplicator(dedupe_title_similarity)
+
     # list all .json files in the input folder
     # for each file, call process_json_input function
     for filename in os.listdir(json_input_folder):
@@ -89,31 +119,47 @@ def process_single_json_file_task(
             logger.info(f"Processing file: {filename}")
 
             file_path = os.path.join(json_input_folder, filename)
-            book_input_list = process_json_input(file_path)
+            with profile_stage("input.parse_and_dedupe"):
+                parsed_books = process_json_input(file_path)
+                book_input_list = deduplicator.deduplicate(parsed_books)
+
+            if not book_input_list and any(
+                not is_blank_book(book) for book in parsed_books
+            ):
+                # every book was already written earlier in this run
+                logger.info(f"Skipping {filename}: all books are duplicates.")
+                timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
+                output_filename = filename.replace(".json", f"_{timestamp}.json")
+                shutil.move(
+                    file_path, os.path.join(json_output_folder, output_filename)
+                )
+                continue
 
             if not book_input_list or len(book_input_list) == 0:
                 # move to error folder
                 shutil.move(file_path, os.path.join(json_error_folder, filename))
-                return
+                continue
 
             filled_count = batch_fill(book_input_list)
             if filled_count == 0:
                 # move to error folder
                 shutil.move(file_path, os.path.join(json_error_folder, filename))
-                return
+                continue
 
             # Add timestamp as postfix to output file
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             output_filename = filename.replace(".json", f"_{timestamp}.csv")
 
             output_success = output_to_markdown(
-                book_input_list, json_book_output_folder
+                book_input_list, json_book_output_folder, catalog_db_path
             )
 
             if not output_success:
                 # move to error folder
                 shutil.move(file_path, os.path.join(json_error_folder, filename))
-                return
+                continue
+
+            deduplicator.mark_processed(book_input_list)
 
             logger.info(
                 f"Successfully processed {filename}: Filled ISBNs for {filled_count} books."
@@ -122,7 +168,6 @@ def process_single_json_file_task(
             timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
             output_filename = filename.replace(".json", f"_{timestamp}.json")
             shutil.move(file_path, os.path.join(json_output_folder, output_filename))
-            return
 
 
 def _run_tasks_once():
@@ -133,15 +178,26 @@ def _run_tasks_once():
         json_output_folder_path=settings.image_to_json_output_folder,
         image_error_folder_path=settings.image_to_json_error_folder,
         resize_width=settings.image_to_json_resize_width,
+        token_budget=settings.image_to_json_token_budget,
+        byte_budget=settings.image_to_json_byte_budget,
+        crop_margins=settings.image_to_json_crop_margins,
+        usage_log_path=settings.image_to_json_usage_log_path,
     )
-    process_single_json_file_task(
+    process_json_files_task(
         json_input_folder=settings.json_input_folder,
         json_output_folder=settings.json_output_folder,
         json_book_output_folder=settings.json_book_output_folder,
         json_error_folder=settings.json_error_folder,
+        catalog_db_path=settings.catalog_db_path,
+        dedupe_title_similarity=settings.book_dedupe_title_similarity,
     )
 
 
+def _run_tasks_profiled():
+    with profile_run(settings.profile_output_folder, settings.profile_top_n):
+        _run_tasks_once()
+
+
 class GracefulKiller:
     kill_now = False
 
@@ -155,6 +211,17 @@ class GracefulKiller:
 
 
 def main():
+    # pick up notes edited, added or deleted outside ibookr since the last run,
+    # before the folders are created so a missing notes folder is not mistaken
+    # for an empty one
+    if settings.catalog_db_path:
+        try:
+            rebuild_catalog(settings.catalog_db_path, settings.json_book_output_folder)
+        except NotADirectoryError as e:
+            logger.warning(f"Skipping catalog sync: {e}")
+        except Exception as e:
+            logger.error(f"Error rebuilding catalog: {e}")
+
     # create necessary folders
     Path(settings.image_to_json_input_folder).mkdir(parents=True, exist_ok=True)
     Path(settings.image_to_json_preprocessed_folder).mkdir(parents=True, exist_ok=True)
@@ -165,14 +232,16 @@ def main():
     Path(settings.json_book_output_folder).mkdir(parents=True, exist_ok=True)
     Path(settings.json_error_folder).mkdir(parents=True, exist_ok=True)
 
+    run_tasks = _run_tasks_profiled if settings.profile else _run_tasks_once
+
     if settings.run_mode == "once":
-        _run_tasks_once()
+        run_tasks()
     elif settings.run_mode == "scheduler":
         logger.info(
             f"Starting scheduler with interval {settings.scheduler_interval_minutes} minutes."
         )
         killer = GracefulKiller()
-        schedule.every(settings.scheduler_interval_minutes).minutes.do(_run_tasks_once)
+        schedule.every(settings.scheduler_interval_minutes).minutes.do(run_tasks)
         while not killer.kill_now:
             schedule.run_pending()
             time.sleep(10)
@@ -0,0 +1,117 @@
+import pytest
+
+from ibookr.helpers.dedupe_helper import (
+    BookDeduplicator,
+    author_surname,
+    display_author,
+    normalize_number,
+    normalize_title,
+)
+from ibookr.helpers.models import Book
+
+
+def _kept(*books: tuple[str, str]) -> list[tuple[str, str]]:
+    result = BookDeduplicator().deduplicate(
+        [Book(title=title, author=author) for title, author in books]
+    )
+    return [(book.title, book.author) for book in result]
+
+
+@pytest.mark.parametrize("word", ["1", "01", "i", "one", "first"])
+def test_normalize_number(word):
+    assert normalize_number(word) == "1"
+
+
+def test_normalize_title_folds_numbers_case_and_accents():
+    assert normalize_title("The Count of Monte Cristo, Vol. I") == (
+        "count of monte cristo vol 1"
+    )
+    assert normalize_title("Cien años de soledad") == "cien anos de soledad"
+
+
+@pytest.mark.parametrize(
+    "author, expected",
+    [
+        ("Carter, Angela", "carter"),
+        ("A. Carter", "carter"),
+        ("Ursula K. Le Guin", "le guin"),
+        ("Le Guin, Ursula", "le guin"),
+        ("Ludwig van Beethoven", "van beethoven"),
+    ],
+)
+def test_author_surname(author, expected):
+    assert author_surname(author) == expected
+
+
+def test_display_author_puts_first_name_first():
+    assert display_author(" Carter, Angela ") == "Angela Carter"
+    assert display_author("Angela Carter") == "Angela Carter"
+
+
+@pytest.mark.parametrize(
+    "first, second, author",
+    [
+        ("Berserk Volume 12", "Berserk Volume 13", "Kentaro Miura"),
+        ("Harry Potter 1", "Harry Potter 2", "J.K. Rowling"),
+        ("Leviathan Wakes Part One", "Leviathan Wakes Part Two", "James S. A. Corey"),
+        ("Star Wars Episode I", "Star Wars Episode V", "George Lucas"),
+        ("The Complete Stories Part V", "The Complete Stories Part X", "Franz Kafka"),
+        (
+            "The Count of Monte Cristo Volume Twenty",
+            "The Count of Monte Cristo Volume Thirty",
+            "Alexandre Dumas",
+        ),
+        ("Chronicles of Narnia Book A", "Chronicles of Narnia Book B", "C. S. Lewis"),
+    ],
+)
+def test_volumes_are_kept_apart(first, second, author):
+    assert len(_kept((first, author), (second, author))) == 2
+
+
+def test_number_spellings_are_merged():
+    assert _kept(
+        ("Don Quixote Vol I", "Miguel de Cervantes"),
+        ("Don Quixote Vol. 1", "Miguel de Cervantes"),
+        ("Don Quixote Volume One", "Miguel de Cervantes"),
+    ) == [("Don Quixote Vol I", "Miguel de Cervantes")]
+
+
+def test_spelling_variants_are_merged():
+    assert _kept(
+        ("The Bloody Chamber", "A. Carter"),
+        ("Bloody Chamber!", "Carter, Angela"),
+        ("Wise Childen", "Angela Carter"),
+        ("Wise Children", "Angela Carter"),
+    ) == [("The Bloody Chamber", "Angela Carter"), ("Wise Childen", "Angela Carter")]
+
+
+def test_short_titles_need_an_exact_match():
+    assert len(_kept(("Love", "Angela Carter"), ("Lovr", "Angela Carter"))) == 2
+
+
+def test_authors_with_surname_particles_are_merged():
+    assert _kept(
+        ("A Wizard of Earthsea", "Le Guin"),
+        ("A Wizard of Earthsea", "Ursula Le Guin"),
+        ("A Wizard of Earthsea", "Ursula K. Le Guin"),
+    ) == [("A Wizard of Earthsea", "Ursula K. Le Guin")]
+
+
+def test_different_authors_with_same_initial_are_kept_apart():
+    assert _kept(("Emma", "Jane Austen"), ("Emma", "Jeremy Austen")) == [
+        ("Emma", "Jane Austen"),
+        ("Emma", "Jeremy Austen"),
+    ]
+
+
+def test_blank_books_are_dropped():
+    assert _kept(("", "Angela Carter"), ("  ", ""), ("Love", "")) == [("Love", "")]
+
+
+def test_processed_books_are_dropped_from_later_files():
+    deduplicator = BookDeduplicator()
+    first_file = deduplicator.deduplicate([Book(title="Love", author="Angela Carter")])
+    assert deduplicator.deduplicate([Book(title="LOVE", author="A. Carter")]) != []
+
+    deduplicator.mark_processed(first_file)
+    assert deduplicator.deduplicate([Book(title="LOVE", author="A. Carter")]) == []